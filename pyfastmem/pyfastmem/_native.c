@@ -0,0 +1,121 @@
+/* Optional native fast path for pyfastmem.
+ *
+ * Implements the AES-256-GCM record payload format (marker byte, 12-byte
+ * nonce, ciphertext, 16-byte tag) in single C calls against OpenSSL's EVP
+ * interface, skipping the Python-level object traffic of the
+ * cryptography package. storage.py falls back to AESGCM when this module
+ * is not built.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <openssl/evp.h>
+
+#define GCM_MARKER 0x02
+#define NONCE_LEN 12
+#define TAG_LEN 16
+
+static PyObject *
+native_gcm_encrypt(PyObject *Py_UNUSED(self), PyObject *args)
+{
+    Py_buffer key, nonce, data;
+    PyObject *out = NULL;
+    EVP_CIPHER_CTX *ctx = NULL;
+    unsigned char *p;
+    int outl = 0, tmplen = 0;
+
+    if (!PyArg_ParseTuple(args, "y*y*y*", &key, &nonce, &data))
+        return NULL;
+    if (key.len != 32 || nonce.len != NONCE_LEN) {
+        PyErr_SetString(PyExc_ValueError, "key must be 32 bytes and nonce 12 bytes");
+        goto done;
+    }
+
+    out = PyBytes_FromStringAndSize(NULL, 1 + NONCE_LEN + data.len + TAG_LEN);
+    if (out == NULL)
+        goto done;
+    p = (unsigned char *)PyBytes_AS_STRING(out);
+    p[0] = GCM_MARKER;
+    memcpy(p + 1, nonce.buf, NONCE_LEN);
+
+    ctx = EVP_CIPHER_CTX_new();
+    if (ctx == NULL
+        || !EVP_EncryptInit_ex(ctx, EVP_aes_256_gcm(), NULL, key.buf, nonce.buf)
+        || !EVP_EncryptUpdate(ctx, p + 1 + NONCE_LEN, &outl, data.buf, (int)data.len)
+        || !EVP_EncryptFinal_ex(ctx, p + 1 + NONCE_LEN + outl, &tmplen)
+        || !EVP_CIPHER_CTX_ctrl(ctx, EVP_CTRL_GCM_GET_TAG, TAG_LEN,
+                                p + 1 + NONCE_LEN + data.len)) {
+        Py_CLEAR(out);
+        PyErr_SetString(PyExc_ValueError, "encryption failed");
+    }
+
+done:
+    if (ctx != NULL)
+        EVP_CIPHER_CTX_free(ctx);
+    PyBuffer_Release(&key);
+    PyBuffer_Release(&nonce);
+    PyBuffer_Release(&data);
+    return out;
+}
+
+static PyObject *
+native_gcm_decrypt(PyObject *Py_UNUSED(self), PyObject *args)
+{
+    Py_buffer key, blob;
+    PyObject *out = NULL;
+    EVP_CIPHER_CTX *ctx = NULL;
+    const unsigned char *p;
+    Py_ssize_t ct_len;
+    int outl = 0, tmplen = 0;
+
+    if (!PyArg_ParseTuple(args, "y*y*", &key, &blob))
+        return NULL;
+    p = (const unsigned char *)blob.buf;
+    ct_len = blob.len - 1 - NONCE_LEN - TAG_LEN;
+    if (key.len != 32 || ct_len < 0 || p[0] != GCM_MARKER) {
+        PyErr_SetString(PyExc_ValueError, "malformed payload");
+        goto done;
+    }
+
+    out = PyBytes_FromStringAndSize(NULL, ct_len);
+    if (out == NULL)
+        goto done;
+
+    ctx = EVP_CIPHER_CTX_new();
+    if (ctx == NULL
+        || !EVP_DecryptInit_ex(ctx, EVP_aes_256_gcm(), NULL, key.buf, p + 1)
+        || !EVP_DecryptUpdate(ctx, (unsigned char *)PyBytes_AS_STRING(out), &outl,
+                              p + 1 + NONCE_LEN, (int)ct_len)
+        || !EVP_CIPHER_CTX_ctrl(ctx, EVP_CTRL_GCM_SET_TAG, TAG_LEN,
+                                (void *)(p + 1 + NONCE_LEN + ct_len))
+        || !EVP_DecryptFinal_ex(ctx,
+                                (unsigned char *)PyBytes_AS_STRING(out) + outl,
+                                &tmplen)) {
+        Py_CLEAR(out);
+        PyErr_SetString(PyExc_ValueError, "decryption failed");
+    }
+
+done:
+    if (ctx != NULL)
+        EVP_CIPHER_CTX_free(ctx);
+    PyBuffer_Release(&key);
+    PyBuffer_Release(&blob);
+    return out;
+}
+
+static PyMethodDef native_methods[] = {
+    {"gcm_encrypt", native_gcm_encrypt, METH_VARARGS,
+     "gcm_encrypt(key, nonce, data) -> marker + nonce + ciphertext + tag"},
+    {"gcm_decrypt", native_gcm_decrypt, METH_VARARGS,
+     "gcm_decrypt(key, payload) -> plaintext"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef native_module = {
+    PyModuleDef_HEAD_INIT, "_native", NULL, -1, native_methods
+};
+
+PyMODINIT_FUNC
+PyInit__native(void)
+{
+    return PyModule_Create(&native_module);
+}
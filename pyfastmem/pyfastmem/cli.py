@@ -4,11 +4,16 @@ Command-line interface for PyFastMem
 import os
 import sys
 import json
+import base64
 import click
 from pathlib import Path
-from typing import Optional
 
-from . import MemoryManager, Storage, SecurityError
+try:
+    import keyring
+except ImportError:
+    keyring = None
+
+from . import MemoryManager, Storage
 
 @click.group()
 @click.version_option()
@@ -117,6 +122,8 @@ def set_password(storage_path: str, password: str) -> None:
     try:
         storage = _load_storage(storage_path)
         storage.set_password(password)
+        # Replace any cached key so the old password stops working here too
+        _keyring_store(storage)
         click.echo("Password set successfully")
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
@@ -129,19 +136,62 @@ def _load_storage(storage_path: str) -> Storage:
     parent = str(path.parent)
     return Storage(name=name, path=parent)
 
-def _unlock_if_needed(memory: MemoryManager, storage: Storage) -> None:
-    """Prompt for password if storage is locked"""
+def _keyring_service(storage: Storage) -> str:
+    """Keyring service name for a storage"""
+    return f"pyfastmem:{storage.path}"
+
+def _keyring_store(storage: Storage) -> None:
+    """Cache the derived key in the OS keyring, bound to the current salt
+
+    The salt is stored alongside the key so a cached entry from before a
+    password change (which rewrites .salt) is recognised as stale instead
+    of silently unlocking the storage with the old key.
+    """
+    if keyring is None or storage._key is None:
+        return
     try:
-        # Try to access storage to check if it's locked
-        memory.get('__test_key')
-    except ValueError as e:
-        if "Storage is locked" in str(e):
-            password = click.prompt('Enter password', hide_input=True)
-            if not storage.unlock(password):
-                click.echo("Invalid password", err=True)
-                sys.exit(1)
-        else:
-            raise
+        salt = storage._load_salt()
+    except ValueError:
+        return
+    keyring.set_password(
+        _keyring_service(storage), 'derived-key',
+        base64.urlsafe_b64encode(salt + storage._key).decode())
+
+def _keyring_unlock(storage: Storage) -> bool:
+    """Try to unlock with a keyring-cached key; False if absent or stale"""
+    if keyring is None:
+        return False
+    stored = keyring.get_password(_keyring_service(storage), 'derived-key')
+    if not stored:
+        return False
+    try:
+        blob = base64.urlsafe_b64decode(stored)
+        salt, key = blob[:16], blob[16:]
+        if salt != storage._load_salt():
+            return False
+    except Exception:
+        return False
+    return storage.unlock_with_key(key)
+
+def _unlock_if_needed(memory: MemoryManager, storage: Storage) -> None:
+    """Unlock the storage if it has a password and no key loaded yet"""
+    # The old probe read a dummy key to trigger a "Storage is locked"
+    # error, but get() returns the default for missing keys, so it never
+    # fired and cost a file access; check the key state directly instead
+    if storage._fernet is not None:
+        return
+    if not os.path.exists(os.path.join(storage.path, '.salt')):
+        # No password configured for this storage
+        return
+    # Reuse a previously derived key from the OS keyring so repeated
+    # commands don't pay the PBKDF2 cost (or prompt) every time
+    if _keyring_unlock(storage):
+        return
+    password = click.prompt('Enter password', hide_input=True)
+    if not storage.unlock(password):
+        click.echo("Invalid password", err=True)
+        sys.exit(1)
+    _keyring_store(storage)
 
 def main():
     cli()
@@ -1,4 +1,4 @@
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Extension
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
@@ -13,6 +13,16 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/pyfastmem",
     packages=find_packages(),
+    ext_modules=[
+        # Optional OpenSSL-backed fast path; pure-Python fallback is used
+        # when the toolchain or headers are unavailable
+        Extension(
+            'pyfastmem._native',
+            sources=['pyfastmem/_native.c'],
+            libraries=['ssl', 'crypto'],
+            optional=True,
+        ),
+    ],
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
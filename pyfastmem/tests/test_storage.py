@@ -0,0 +1,254 @@
+"""
+Smoke tests for the storage engine: cipher roundtrips across every
+payload format, format dispatch in decrypt, and the core MemoryManager
+operations. Kept deliberately small and dependency-free so they run on
+a bare install.
+"""
+import base64
+
+import pytest
+
+from pyfastmem.storage import (
+    Storage, MemoryManager, _RawFernet, _STREAM_CHUNK, _STREAM_OVERHEAD,
+    _GCM_MARKER, _STREAM_MARKER,
+)
+
+# Fast KDF so unlocks don't dominate the test run
+ITERATIONS = 1000
+
+
+@pytest.fixture
+def storage(tmp_path):
+    s = Storage(name='test', path=str(tmp_path), iterations=ITERATIONS)
+    s.set_password('pw')
+    return s
+
+
+def make_storage(tmp_path, **kwargs):
+    s = Storage(name='test', path=str(tmp_path), iterations=ITERATIONS,
+                **kwargs)
+    s.set_password('pw')
+    return s
+
+
+class TestCiphers:
+    def test_fernet_roundtrip(self, storage):
+        token = storage.encrypt(b'hello')
+        assert token[:1] == b'\x80'
+        assert storage.decrypt(token) == b'hello'
+
+    def test_fernet_accepts_base64_tokens(self, storage):
+        # Records written by cryptography's Fernet are base64; decrypt
+        # must still read them
+        token = base64.urlsafe_b64encode(storage.encrypt(b'legacy'))
+        assert storage.decrypt(token) == b'legacy'
+
+    def test_gcm_roundtrip(self, tmp_path):
+        s = make_storage(tmp_path, cipher='aes-gcm')
+        token = s.encrypt(b'hello')
+        assert token[:1] == _GCM_MARKER
+        assert s.decrypt(token) == b'hello'
+
+    def test_mixed_log_dispatch(self, tmp_path):
+        # decrypt dispatches on the payload marker, not the configured
+        # cipher, so one unlocked storage reads both formats
+        s = make_storage(tmp_path, cipher='aes-gcm')
+        gcm_token = s.encrypt(b'gcm')
+        s.cipher = 'fernet'
+        fernet_token = s.encrypt(b'fernet')
+        assert s.decrypt(gcm_token) == b'gcm'
+        assert s.decrypt(fernet_token) == b'fernet'
+
+    def test_raw_fernet_rejects_tamper(self, storage):
+        token = bytearray(storage.encrypt(b'hello'))
+        token[15] ^= 1
+        with pytest.raises(Exception):
+            _RawFernet(storage._key).decrypt(bytes(token))
+
+    def test_locked_storage_raises(self, tmp_path):
+        s = Storage(name='test', path=str(tmp_path), iterations=ITERATIONS)
+        with pytest.raises(ValueError):
+            s.encrypt(b'data')
+
+    def test_unlock_roundtrip(self, storage, tmp_path):
+        token = storage.encrypt(b'hello')
+        fresh = Storage(name='test', path=str(tmp_path),
+                        iterations=ITERATIONS)
+        assert fresh.unlock('pw')
+        assert fresh.decrypt(token) == b'hello'
+        assert Storage(name='test', path=str(tmp_path),
+                       iterations=ITERATIONS).unlock_with_key(storage._key)
+
+
+class TestStream:
+    def test_roundtrip_and_overhead(self, storage):
+        data = b'x' * (2 * _STREAM_CHUNK + 17)
+        blob = b''.join(storage.encrypt_stream(data))
+        assert blob[:1] == _STREAM_MARKER
+        assert len(blob) == len(data) + _STREAM_OVERHEAD
+        assert storage.decrypt_stream(blob) == data
+
+    def test_marker_is_authenticated(self, storage):
+        blob = bytearray(b''.join(storage.encrypt_stream(b'y' * 1000)))
+        blob[0] ^= 1
+        with pytest.raises(Exception):
+            storage.decrypt_stream(bytes(blob))
+
+    def test_body_tamper_detected(self, storage):
+        blob = bytearray(b''.join(storage.encrypt_stream(b'y' * 1000)))
+        blob[100] ^= 1
+        with pytest.raises(Exception):
+            storage.decrypt_stream(bytes(blob))
+
+
+class TestMemoryManager:
+    def test_set_get_delete(self, storage):
+        m = MemoryManager(storage)
+        m.set('a', {'x': [1, 2, 3]})
+        assert m.get('a') == {'x': [1, 2, 3]}
+        assert m.get('missing', 'default') == 'default'
+        assert m.delete('a')
+        assert not m.delete('a')
+        assert m.get('a') is None
+        m.close()
+
+    def test_large_value_streams(self, storage):
+        m = MemoryManager(storage)
+        big = 'z' * (2 * _STREAM_CHUNK)
+        m.set('big', big)
+        assert m.get('big') == big
+        m.close()
+
+    def test_returned_values_are_fresh(self, storage):
+        m = MemoryManager(storage)
+        m.set('mut', {'n': 1})
+        m.get('mut')['n'] = 42
+        assert m.get('mut') == {'n': 1}
+        m.close()
+
+    def test_persists_across_instances(self, storage, tmp_path):
+        m = MemoryManager(storage)
+        m.set_many({f'k{i}': i for i in range(20)})
+        m.flush()
+        m.close()
+        fresh = Storage(name='test', path=str(tmp_path),
+                        iterations=ITERATIONS)
+        assert fresh.unlock('pw')
+        m2 = MemoryManager(fresh)
+        assert m2.get('k7') == 7
+        m2.close()
+
+    def test_compact_keeps_live_records(self, storage):
+        m = MemoryManager(storage)
+        for i in range(10):
+            m.set('churn', i)
+        m.set('keep', 'v')
+        m.delete('churn')
+        m.compact()
+        assert m.get('keep') == 'v'
+        assert m.get('churn') is None
+        m.close()
+
+    def test_superseded_map_stays_readable(self, storage):
+        # A reader holding the old mapping while another rebuilds it must
+        # not see a closed object
+        m = MemoryManager(storage)
+        m.set('a', 1)
+        assert m.get('a') == 1
+        old_map = m._mmap
+        assert old_map is not None
+        m.set('grow', 'x' * 4096)
+        assert m.get('grow') == 'x' * 4096
+        assert m._mmap is not old_map
+        assert bytes(old_map[:1])  # still open, no ValueError
+        m.close()
+
+    def test_swapped_log_stays_open(self, storage):
+        # clear/compact replace the log object; a reader that already
+        # snapshotted it must still be able to flush/pread on it
+        m = MemoryManager(storage)
+        m.set('a', 1)
+        old_log = m._log
+        m.compact()
+        assert m._log is not old_log
+        old_log.flush()  # would raise ValueError if it had been closed
+        m.clear()
+        m.close()
+
+    def test_concurrent_reads_never_fail_spuriously(self, storage):
+        # Readers racing map rebuilds (every append can trigger one) on
+        # stable keys must always succeed: rebuilds publish a new map
+        # over the old one instead of closing it
+        import threading
+        m = MemoryManager(storage)
+        for i in range(10):
+            m.set(f'stable{i}', i)
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                for i in range(10):
+                    try:
+                        assert m.get(f'stable{i}') == i
+                    except Exception as e:
+                        errors.append(e)
+                        return
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for round_ in range(50):
+            m.set(f'churn{round_}', 'y' * 2048)
+        stop.set()
+        for t in threads:
+            t.join()
+        m.close()
+        assert not errors
+
+    def test_torn_tail_record_is_skipped(self, storage, tmp_path):
+        # A crash can flush a record header without its value; the scan
+        # must treat the torn key as unwritten, not index it
+        m = MemoryManager(storage)
+        m.set('good', 1)
+        m.flush()
+        m.close()
+        log_path = tmp_path / 'test' / 'data.log'
+        (tmp_path / 'test' / '.index').unlink()
+        import struct
+        with open(log_path, 'ab') as f:
+            f.write(struct.pack('<II', 4, 500) + b'torn' + b'x' * 10)
+        fresh = Storage(name='test', path=str(tmp_path),
+                        iterations=ITERATIONS)
+        assert fresh.unlock('pw')
+        m2 = MemoryManager(fresh)
+        assert m2.get('good') == 1
+        assert m2.get('torn') is None
+        m2.close()
+
+    def test_save_load_roundtrip(self, storage):
+        m = MemoryManager(storage)
+        m.set('a', 1)
+        m.save('snap')
+        m.load('snap')
+        assert m.get('a') == 1
+        m.close()
+
+    def test_load_rejects_bad_state_files(self, storage, tmp_path):
+        m = MemoryManager(storage)
+        with pytest.raises(ValueError):
+            m.load('missing')
+        # Pre-pickle state files were JSON; they must fail cleanly too
+        (tmp_path / 'test' / 'old.state').write_text('{"index": {}}')
+        with pytest.raises(ValueError):
+            m.load('old')
+        m.close()
+
+    def test_clear(self, storage):
+        m = MemoryManager(storage)
+        m.set('a', 1)
+        m.clear()
+        assert m.get('a') is None
+        m.set('b', 2)
+        assert m.get('b') == 2
+        m.close()